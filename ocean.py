@@ -4,10 +4,12 @@ import numpy as np
 import plotly
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
+import pydeck as pdk
+from datetime import date, datetime, timedelta
 import time
-import random
 import os
+import html
+from types import MappingProxyType
 
 
 # ---------------- Page config ----------------
@@ -24,37 +26,62 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CSS_PATH = os.path.join(BASE_DIR, "style.css")
 
 
-if os.path.exists(CSS_PATH):
-    with open(CSS_PATH, "r", encoding="utf-8") as f:
-        st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
-else:
-    # Fallback minimal styling so app doesn't crash if style.css missing
-    st.markdown(
-        """
-        <style>
-        #MainMenu { visibility: hidden; }
-        footer { visibility: hidden; }
-        .header { text-align: center; padding: 20px 10px; }
-        .header h1 { color: #e0f7fa; margin: 0; font-size: 34px; }
-        .tagline { color: #90e0ef; margin-top: 6px; font-size: 14px; }
-        .chat-container { max-height: 420px; overflow-y: auto; padding: 14px; background: rgba(9,35,55,0.65); border-radius: 12px; margin-bottom: 12px; display: flex; flex-direction: column; scroll-behavior: smooth; }
-        .chat-container::-webkit-scrollbar { width: 8px; }
-        .chat-container::-webkit-scrollbar-thumb { background: linear-gradient(#48cae4, #4cc9f0); border-radius: 8px; }
-        .chat-message { padding: 1rem; border-radius: 0.75rem; margin-bottom: 0.9rem; max-width: 85%; }
-        .chat-message.user { background-color: rgba(72,202,228,0.12); margin-left: auto; }
-        .chat-message.assistant { background-color: rgba(0,119,182,0.12); margin-right: auto; }
-        .timestamp { font-size: 0.75rem; color: #90e0ef; text-align: right; margin-top: 0.5rem; }
-        </style>
-        """,
-        unsafe_allow_html=True,
-    )
+# Seconds of fake "AI processing" per request; off by default, set for demos.
+def parse_delay(value):
+    # a bad value must not break page loads: flag-style "true"/"yes"/"on" means 1s,
+    # anything else non-numeric, negative or infinite means no delay
+    try:
+        seconds = float(value)
+    except ValueError:
+        return 1.0 if value.strip().lower() in ("true", "yes", "on") else 0.0
+    return seconds if 0 < seconds < float("inf") else 0.0
+
+
+SIMULATE_DELAY = parse_delay(os.environ.get("FLOATCHAT_SIMULATE_DELAY", "0"))
+
+
+# Fallback minimal styling so app doesn't crash if style.css missing
+FALLBACK_CSS = """
+#MainMenu { visibility: hidden; }
+footer { visibility: hidden; }
+.header { text-align: center; padding: 20px 10px; }
+.header h1 { color: #e0f7fa; margin: 0; font-size: 34px; }
+.tagline { color: #90e0ef; margin-top: 6px; font-size: 14px; }
+.chat-container { max-height: 420px; overflow-y: auto; padding: 14px; background: rgba(9,35,55,0.65); border-radius: 12px; margin-bottom: 12px; display: flex; flex-direction: column; scroll-behavior: smooth; }
+.chat-container::-webkit-scrollbar { width: 8px; }
+.chat-container::-webkit-scrollbar-thumb { background: linear-gradient(#48cae4, #4cc9f0); border-radius: 8px; }
+.chat-message { padding: 1rem; border-radius: 0.75rem; margin-bottom: 0.9rem; max-width: 85%; }
+.chat-message.user { background-color: rgba(72,202,228,0.12); margin-left: auto; }
+.chat-message.assistant { background-color: rgba(0,119,182,0.12); margin-right: auto; }
+.timestamp { font-size: 0.75rem; color: #90e0ef; text-align: right; margin-top: 0.5rem; }
+"""
+
+
+# read once per server process instead of on every rerun
+@st.cache_resource
+def load_css(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+@st.cache_resource
+def file_exists(path):
+    return os.path.exists(path)
+
+
+css = load_css(CSS_PATH)
+page_css = css if css is not None else FALLBACK_CSS
+st.markdown(f"<style>{page_css}</style>", unsafe_allow_html=True)
+if css is None:
     st.warning("style.css not found — using fallback styles. Add a 'style.css' file in the same folder to use the full theme.")
 
 
 # ---------------- Header ----------------
 logo_path = os.path.join(BASE_DIR, "logo.png")
 header_html = ""
-if os.path.exists(logo_path):
+if file_exists(logo_path):
     header_html += f'<img src="logo.png" class="header-logo" width="80" />'
 
 
@@ -78,65 +105,310 @@ if "messages" not in st.session_state:
     ]
 
 
+# rendered chat history; only messages past chat_html_len still need formatting
+if "chat_html_cache" not in st.session_state:
+    st.session_state.chat_html_cache = ""
+    st.session_state.chat_html_len = 0
+
+
+PALETTE = np.array(["#ff9e00", "#48cae4", "#9d4edd", "#f72585", "#4cc9f0"])
+
+
 if "map_data" not in st.session_state:
+    # draw every column in one vectorized call per column instead of per-float Python loops
+    rng = np.random.default_rng(0)
     st.session_state.map_data = pd.DataFrame({
-        "lat": [random.uniform(-60, 60) for _ in range(50)],
-        "lon": [random.uniform(-180, 180) for _ in range(50)],
-        "size": [random.randint(5, 15) for _ in range(50)],
-        "color": [random.choice(["#ff9e00", "#48cae4", "#9d4edd", "#f72585", "#4cc9f0"]) for _ in range(50)],
-        "value": [random.uniform(0, 30) for _ in range(50)],
+        "lat": rng.uniform(-60, 60, 50),
+        "lon": rng.uniform(-180, 180, 50),
+        "size": rng.integers(5, 16, 50),
+        "color": PALETTE[rng.integers(0, PALETTE.size, 50)],
+        "value": rng.uniform(0, 30, 50),
     })
 
 
-# ---------------- Main layout ----------------
-tab1, tab2, tab3 = st.tabs(["Chat Interface", "Data Visualization", "Export Data"])
+# map_data never changes after init, so build the map layer once per session
+if "deck" not in st.session_state:
+    layer = pdk.Layer(
+        "ScatterplotLayer",
+        st.session_state.map_data[["lat", "lon"]],
+        get_position=["lon", "lat"],
+        get_radius=50000,
+        get_fill_color=[72, 202, 228, 160],
+    )
+    st.session_state.deck = pdk.Deck(layers=[layer], initial_view_state=pdk.ViewState(latitude=0, longitude=0, zoom=1))
 
 
-# ---------- Tab 1: Chat Interface ----------
-with tab1:
-    col1, col2 = st.columns([1, 2])
+# ---------------- Chat rendering ----------------
+MSG_TEMPLATE = (
+    '<div class="chat-message {role_class}">'
+    '<div class="message-content">{content}</div>'
+    '<div class="timestamp">{timestamp}</div>'
+    '</div>'
+)
 
 
-    with col1:
-        st.markdown("### 💬 Chat with OceanAI")
+def render_chat_html(messages):
+    # history is append-only, so format just the new tail and reuse the cached prefix
+    if st.session_state.chat_html_len > len(messages):
+        st.session_state.chat_html_cache = ""
+        st.session_state.chat_html_len = 0
+    new_parts = [
+        MSG_TEMPLATE.format(
+            role_class="assistant" if msg.get("role", "") == "assistant" else "user",
+            # escape user text: the chat iframe runs scripts, so raw markup must never reach it
+            content=html.escape(str(msg.get("content", ""))).replace("\n", "<br>"),
+            timestamp=msg.get("timestamp", ""),
+        )
+        for msg in messages[st.session_state.chat_html_len:]
+    ]
+    if new_parts:
+        st.session_state.chat_html_cache += "\n" + "\n".join(new_parts)
+        st.session_state.chat_html_len = len(messages)
+    return '<div class="chat-container" id="chat-container">' + st.session_state.chat_html_cache + "\n</div>"
+
+
+# ---------------- Chat handlers ----------------
+QUICK_RESPONSES = MappingProxyType({
+    "Show floats near Hawaii": "I found 12 ARGO floats near Hawaii in the last month. Here are their trajectories and data profiles.",
+    "Salinity trends last 6 months": "Salinity has shown a slight decrease of 0.2 PSU in the Pacific Ocean over the last 6 months. Here's the trend analysis.",
+    "Temperature at 200m depth": "The average temperature at 200m depth is 15.3°C across all ARGO floats. Here's the spatial distribution.",
+    "Compare BGC parameters": "I've compared Bio-Geo-Chemical parameters across different ocean basins. The Indian Ocean shows higher chlorophyll concentrations.",
+})
+
+
+# These run as on_click callbacks, i.e. before the script body reruns, so the
+# new messages are rendered in that same pass without an extra st.rerun().
+def handle_quick_query(query):
+    now = datetime.now().strftime("%H:%M")
+    # add user message
+    st.session_state.messages.append({"role": "user", "content": query, "timestamp": now})
+
+
+    # simulate processing and add assistant response
+    with st.spinner("Processing..."):
+        if SIMULATE_DELAY:
+            time.sleep(SIMULATE_DELAY)
+        ai_resp = QUICK_RESPONSES.get(query, "Here are the results visualized on the map and graphs.")
+        st.session_state.messages.append({"role": "assistant", "content": ai_resp, "timestamp": now})
+
+
+def handle_send():
+    user_input = st.session_state.user_input
+    if user_input and user_input.strip() != "":
+        now = datetime.now().strftime("%H:%M")
+        st.session_state.messages.append({"role": "user", "content": user_input, "timestamp": now})
+
+
+        with st.spinner("Processing..."):
+            if SIMULATE_DELAY:
+                time.sleep(SIMULATE_DELAY)
+            ai_response = f"I'm processing your request for '{user_input}'. Here are the results visualized on the map and graphs."
+            st.session_state.messages.append({"role": "assistant", "content": ai_response, "timestamp": now})
+
+
+# ---------------- Cached synthetic data ----------------
+# Streamlit reruns the whole script on every interaction; these memoize the
+# demo series so reruns don't redo the arange/sin/random work. float32 is plenty
+# for plotting and halves the memory the arithmetic has to move.
+# One Gaussian pool per process; each series reads its own non-overlapping
+# window of it instead of drawing fresh noise.
+@st.cache_resource
+def noise_pool(size=4096, seed=42):
+    return np.random.default_rng(seed).standard_normal(size, dtype=np.float32)
+
+
+def synth_series(base, amp, period, noise_scale, noise, step=1):
+    # base + amp * sin(x / period) + noise, computed in place in a single output buffer
+    x = np.arange(0, noise.size * step, step, dtype=np.float32)
+    out = np.divide(x, period, dtype=np.float32)
+    np.sin(out, out=out)
+    out *= amp
+    out += base
+    out += noise_scale * noise
+    return x, out
+
+
+@st.cache_data
+def salinity_profile(n=100, offset=0):
+    noise = noise_pool()[offset:offset + n]
+    return synth_series(35, 0.1, 50, 0.05, noise, step=10)
+
+
+@st.cache_data
+def temperature_series(n=30, offset=100):
+    noise = noise_pool()[offset:offset + n]
+    return synth_series(20, 5, 5, 0.5, noise)[1]
+
+
+# keyed on the local date, so the cached frame rolls over exactly at midnight
+@st.cache_data(max_entries=2)
+def time_series_df(today, n=90, offset=130):
+    pool = noise_pool()
+    return pd.DataFrame({
+        "date": recent_days(n, today),
+        "temperature": synth_series(20, 5, 10, 0.8, pool[offset:offset + n])[1],
+        "salinity": synth_series(35, 0.5, 15, 0.2, pool[offset + n:offset + 2 * n])[1],
+    })
 
 
-        # Build chat HTML string inside a single container so scrollbar & auto-scroll work reliably
-        chat_html_parts = ['<div class="chat-container" id="chat-container">']
+# Trailing n calendar days ending at `today`. Callers pass date.today() (local
+# time, like the pd.Timestamp.today() this replaced); np.datetime64("today") would
+# be UTC. Keying on the date instead of a ttl means results never go stale.
+@st.cache_data(max_entries=8)
+def recent_days(n, today):
+    end = np.datetime64(today, "D")
+    return end - np.arange(n - 1, -1, -1, dtype="timedelta64[D]")
+
 
+# per-column bounds for latitude, longitude, temperature, salinity, depth
+SAMPLE_LOWS = np.array([-60, -180, 0, 33, 0])
+SAMPLE_HIGHS = np.array([60, 180, 30, 37, 2000])
 
-        for msg in st.session_state.messages:
-            role_class = "assistant" if msg.get("role", "") == "assistant" else "user"
-            # sanitize simple HTML chars to avoid breaking markup (basic)
-            content = str(msg.get("content", "")).replace("\n", "<br>")
-            timestamp = msg.get("timestamp", "")
-            chat_html_parts.append(
-                f'<div class="chat-message {role_class}">'
-                f'<div class="message-content">{content}</div>'
-                f'<div class="timestamp">{timestamp}</div>'
-                f'</div>'
-            )
 
+def build_sample_df(n=10):
+    # one uniform draw fills every numeric column; bounds broadcast across rows
+    arr = np.random.default_rng().uniform(SAMPLE_LOWS, SAMPLE_HIGHS, (n, SAMPLE_LOWS.size))
+    return pd.DataFrame({
+        "date": recent_days(n, date.today()),
+        "latitude": arr[:, 0],
+        "longitude": arr[:, 1],
+        "temperature": arr[:, 2],
+        "salinity": arr[:, 3],
+        "depth": arr[:, 4],
+    })
+
+
+# ---------------- Cached figures ----------------
+# Shared chart styling: one definition for the colors/font/margins every chart
+# repeated as inline literals before.
+DARK_LAYOUT = {
+    "plot_bgcolor": "rgba(0,0,0,0)",
+    "paper_bgcolor": "rgba(0,0,0,0)",
+    "font": {"color": "#e0f7fa"},
+}
+BASE_LAYOUT = {**DARK_LAYOUT, "margin": {"l": 20, "r": 20, "t": 30, "b": 20}, "height": 250}
+
+
+# Figures are keyed on the data they plot. cache_resource hands back the same
+# object on a hit; cache_data would unpickle it, which re-runs Plotly's validating
+# constructor and costs as much as building it. st.plotly_chart only reads the figure.
+@st.cache_resource
+def salinity_fig(depth, salinity):
+    fig = go.Figure()
+    fig.add_trace(go.Scattergl(x=salinity, y=depth, mode="lines", name="Salinity", line=dict(color="#48cae4")))
+    fig.update_layout(
+        BASE_LAYOUT,
+        xaxis_title="Salinity (PSU)",
+        yaxis_title="Depth (m)",
+        yaxis=dict(autorange="reversed"),
+    )
+    return fig
+
+
+# dates roll daily, so bound the entries rather than keep one per day
+@st.cache_resource(max_entries=2)
+def temperature_fig(dates, temperature):
+    fig = go.Figure()
+    fig.add_trace(go.Scattergl(x=dates, y=temperature, mode="lines+markers", name="Temperature", line=dict(color="#f72585")))
+    fig.update_layout(
+        BASE_LAYOUT,
+        xaxis_title="Date",
+        yaxis_title="Temperature (°C)",
+    )
+    return fig
 
-        chat_html_parts.append("</div>")
-        chat_html = "\n".join(chat_html_parts)
 
+OCEANS = ["Pacific", "Atlantic", "Indian", "Southern", "Arctic"]
+AVG_TEMP = [18.5, 16.2, 22.1, 3.4, -1.2]
 
-        # Render the chat container and messages
-        st.markdown(chat_html, unsafe_allow_html=True)
 
+# constant data; the script body reruns on every interaction, so the figure is
+# cached as a resource and only built on the first Chat Interface render
+@st.cache_resource
+def depth_bar_fig():
+    fig = go.Figure(go.Bar(x=OCEANS, y=AVG_TEMP, marker_color=PALETTE.tolist()))
+    fig.update_layout(
+        BASE_LAYOUT,
+        xaxis_title="Ocean",
+        yaxis_title="Average Temperature (°C)",
+    )
+    return fig
+
+
+# keyed on the same local date as time_series_df; held as a resource for the
+# same reason as the Tab-1 figures
+@st.cache_resource(max_entries=4)
+def time_series_fig(chart_type, today):
+    time_series_data = time_series_df(today)
+
+
+    if chart_type == "Line Chart":
+        fig = px.line(time_series_data, x="date", y=["temperature", "salinity"], labels={"value": "Measurement", "variable": "Parameter"}, color_discrete_map={"temperature": "#f72585", "salinity": "#48cae4"}, render_mode="webgl")
+    else:
+        # stacked areas aren't supported by scattergl, so this one stays SVG
+        fig = px.area(time_series_data, x="date", y=["temperature", "salinity"], labels={"value": "Measurement", "variable": "Parameter"}, color_discrete_map={"temperature": "#f72585", "salinity": "#48cae4"})
+
+    fig.update_layout(DARK_LAYOUT, height=400, legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
+    return fig
 
-        # Auto-scroll to bottom using JS on each rerun
-        st.markdown(
-            """
+
+# ---------------- Main layout ----------------
+# Streamlit drops the state of widgets that aren't rendered in a run. With only
+# one section executing, re-saving these keys each run keeps their values across
+# section switches, as st.tabs did. Defaults live here instead of in the widget
+# calls, since a widget shouldn't get both a default and a session-state value.
+SECTION_WIDGET_DEFAULTS = {
+    "user_input": "",
+    "map_type": "Temperature",
+    "map_date_range": (date.today() - timedelta(days=30), date.today()),
+    "depth_range": (0, 1000),
+    "ocean_basin": ["Pacific", "Atlantic", "Indian"],
+    "chart_type": "Line Chart",
+    "export_format": "CSV",
+    "data_range": "All Data",
+    "custom_dates": (date.today() - timedelta(days=30), date.today()),
+    "include_metadata": True,
+}
+for key, default in SECTION_WIDGET_DEFAULTS.items():
+    st.session_state[key] = st.session_state.get(key, default)
+
+
+# st.tabs runs every tab body on each rerun; a radio lets us execute only the visible one
+active_tab = st.radio("Section", ["Chat Interface", "Data Visualization", "Export Data"], horizontal=True, key="active_tab", label_visibility="collapsed")
+
+
+# ---------- Tab 1: Chat Interface ----------
+if active_tab == "Chat Interface":
+    col1, col2 = st.columns([1, 2])
+
+
+    with col1:
+        st.markdown("### 💬 Chat with OceanAI")
+
+
+        # Build chat HTML string inside a single container so scrollbar & auto-scroll work reliably
+        chat_html = render_chat_html(st.session_state.messages)
+
+
+        # Render in an iframe (skips the markdown parser); the iframe doesn't inherit
+        # page styles, so ship the stylesheet and auto-scroll with it. The iframe is
+        # sized to its content, so the container's own scrollbar is the only one.
+        st.iframe(
+            f"""
+            <style>
+            {page_css}
+            body {{ margin: 0; background: transparent; }}
+            .chat-container {{ box-sizing: border-box; margin-bottom: 0; }}
+            </style>
+            {chat_html}
             <script>
             const chatContainer = document.getElementById('chat-container');
-            if (chatContainer) {
+            if (chatContainer) {{
                 chatContainer.scrollTop = chatContainer.scrollHeight;
-            }
+            }}
             </script>
             """,
-            unsafe_allow_html=True,
+            height="content",
         )
 
 
@@ -151,126 +423,51 @@ with tab1:
 
 
         for i, query in enumerate(suggested_queries):
-            if st.button(query, key=f"quick_{i}"):
-                now = datetime.now().strftime("%H:%M")
-                # add user message
-                st.session_state.messages.append({"role": "user", "content": query, "timestamp": now})
-
-
-                # simulate processing and add assistant response
-                with st.spinner("Processing..."):
-                    time.sleep(1)
-                    responses = {
-                        "Show floats near Hawaii": "I found 12 ARGO floats near Hawaii in the last month. Here are their trajectories and data profiles.",
-                        "Salinity trends last 6 months": "Salinity has shown a slight decrease of 0.2 PSU in the Pacific Ocean over the last 6 months. Here's the trend analysis.",
-                        "Temperature at 200m depth": "The average temperature at 200m depth is 15.3°C across all ARGO floats. Here's the spatial distribution.",
-                        "Compare BGC parameters": "I've compared Bio-Geo-Chemical parameters across different ocean basins. The Indian Ocean shows higher chlorophyll concentrations.",
-                    }
-                    ai_resp = responses.get(query, "Here are the results visualized on the map and graphs.")
-                    now2 = datetime.now().strftime("%H:%M")
-                    st.session_state.messages.append({"role": "assistant", "content": ai_resp, "timestamp": now2})
-
-
-                # rerun to update UI (and trigger auto-scroll)
-                st.rerun()
+            st.button(query, key=f"quick_{i}", on_click=handle_quick_query, args=(query,))
 
 
         # Chat input area
-        user_input = st.text_input("Ask about ocean data...", key="user_input", label_visibility="collapsed")
-        if st.button("Send", key="send_button"):
-            if user_input and user_input.strip() != "":
-                now = datetime.now().strftime("%H:%M")
-                st.session_state.messages.append({"role": "user", "content": user_input, "timestamp": now})
-
-
-                with st.spinner("Processing..."):
-                    time.sleep(1.2)
-                    ai_response = f"I'm processing your request for '{user_input}'. Here are the results visualized on the map and graphs."
-                    st.session_state.messages.append({"role": "assistant", "content": ai_response, "timestamp": datetime.now().strftime("%H:%M")})
-
-
-                st.rerun()
+        st.text_input("Ask about ocean data...", key="user_input", label_visibility="collapsed")
+        st.button("Send", key="send_button", on_click=handle_send)
 
 
     # ---------- Right column: Data Visualization (kept intact) ----------
     with col2:
         st.markdown("### 🌊 Data Visualization")
         st.markdown("#### ARGO Float Locations")
-        # show only lat/lon for st.map
-        st.map(st.session_state.map_data[["lat", "lon"]], use_container_width=True)
+        st.pydeck_chart(st.session_state.deck, width="stretch")
 
 
         col3, col4 = st.columns(2)
         with col3:
             st.markdown("#### Salinity Profile")
-            depth = np.arange(0, 1000, 10)
-            salinity = 35 + 0.1 * np.sin(depth / 50) + 0.05 * np.random.randn(len(depth))
-
-
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=salinity, y=depth, mode="lines", name="Salinity", line=dict(color="#48cae4")))
-            fig.update_layout(
-                xaxis_title="Salinity (PSU)",
-                yaxis_title="Depth (m)",
-                yaxis=dict(autorange="reversed"),
-                height=250,
-                margin=dict(l=20, r=20, t=30, b=20),
-                plot_bgcolor="rgba(0,0,0,0)",
-                paper_bgcolor="rgba(0,0,0,0)",
-                font=dict(color="#e0f7fa"),
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            depth, salinity = salinity_profile()
+            # theme=None skips Streamlit's theme merge; the layout already carries our colors
+            st.plotly_chart(salinity_fig(depth, salinity), width="stretch", theme=None)
 
 
         with col4:
             st.markdown("#### Temperature Over Time")
-            dates = pd.date_range(end=pd.Timestamp.today(), periods=30, freq="D")
-            temperature = 20 + 5 * np.sin(np.arange(30) / 5) + 0.5 * np.random.randn(30)
-
-
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=dates, y=temperature, mode="lines+markers", name="Temperature", line=dict(color="#f72585")))
-            fig.update_layout(
-                xaxis_title="Date",
-                yaxis_title="Temperature (°C)",
-                height=250,
-                margin=dict(l=20, r=20, t=30, b=20),
-                plot_bgcolor="rgba(0,0,0,0)",
-                paper_bgcolor="rgba(0,0,0,0)",
-                font=dict(color="#e0f7fa"),
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            # whole days as a plain ndarray: hashable by the figure cache and stable all day
+            dates = recent_days(30, date.today())
+            temperature = temperature_series()
+            st.plotly_chart(temperature_fig(dates, temperature), width="stretch", theme=None)
 
 
         st.markdown("#### Depth Comparison")
-        oceans = ["Pacific", "Atlantic", "Indian", "Southern", "Arctic"]
-        avg_temp = [18.5, 16.2, 22.1, 3.4, -1.2]
-
-
-        fig = go.Figure()
-        fig.add_trace(go.Bar(x=oceans, y=avg_temp, marker_color=["#ff9e00", "#48cae4", "#9d4edd", "#f72585", "#4cc9f0"]))
-        fig.update_layout(
-            xaxis_title="Ocean",
-            yaxis_title="Average Temperature (°C)",
-            height=250,
-            margin=dict(l=20, r=20, t=30, b=20),
-            plot_bgcolor="rgba(0,0,0,0)",
-            paper_bgcolor="rgba(0,0,0,0)",
-            font=dict(color="#e0f7fa"),
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(depth_bar_fig(), width="stretch", theme=None)
 
 
 # ---------- Tab 2: Advanced visualizations ----------
-with tab2:
+if active_tab == "Data Visualization":
     st.markdown("## 📊 Advanced Data Visualization")
     col1, col2 = st.columns(2)
 
 
     with col1:
         st.markdown("### Map Visualization Options")
-        map_type = st.selectbox("Select Map Overlay", ["Temperature", "Salinity", "Chlorophyll", "Oxygen"])
-        date_range = st.date_input("Select Date Range", value=(datetime.now() - timedelta(days=30), datetime.now()), max_value=datetime.now())
+        map_type = st.selectbox("Select Map Overlay", ["Temperature", "Salinity", "Chlorophyll", "Oxygen"], key="map_type")
+        date_range = st.date_input("Select Date Range", max_value=datetime.now(), key="map_date_range")
 
 
         if st.button("Update Map", key="update_map"):
@@ -279,8 +476,8 @@ with tab2:
 
     with col2:
         st.markdown("### Data Filtering")
-        depth_range = st.slider("Depth Range (m)", 0, 2000, (0, 1000))
-        ocean_basin = st.multiselect("Ocean Basin", ["Pacific", "Atlantic", "Indian", "Southern", "Arctic"], default=["Pacific", "Atlantic", "Indian"])
+        depth_range = st.slider("Depth Range (m)", 0, 2000, key="depth_range")
+        ocean_basin = st.multiselect("Ocean Basin", ["Pacific", "Atlantic", "Indian", "Southern", "Arctic"], key="ocean_basin")
 
 
         if st.button("Apply Filters", key="apply_filters"):
@@ -288,75 +485,58 @@ with tab2:
 
 
     # time series
-    time_series_data = pd.DataFrame({
-        "date": pd.date_range(end=pd.Timestamp.today(), periods=90, freq="D"),
-        "temperature": 20 + 5 * np.sin(np.arange(90) / 10) + 0.8 * np.random.randn(90),
-        "salinity": 35 + 0.5 * np.sin(np.arange(90) / 15) + 0.2 * np.random.randn(90),
-    })
-
-
     st.markdown("### Time Series Data")
-    chart_type = st.radio("Select Chart Type", ["Line Chart", "Area Chart"], horizontal=True)
-
-
-    if chart_type == "Line Chart":
-        fig = px.line(time_series_data, x="date", y=["temperature", "salinity"], labels={"value": "Measurement", "variable": "Parameter"}, color_discrete_map={"temperature": "#f72585", "salinity": "#48cae4"})
-    else:
-        fig = px.area(time_series_data, x="date", y=["temperature", "salinity"], labels={"value": "Measurement", "variable": "Parameter"}, color_discrete_map={"temperature": "#f72585", "salinity": "#48cae4"})
-
-    fig.update_layout(height=400, plot_bgcolor="rgba(0,0,0,0)", paper_bgcolor="rgba(0,0,0,0)", font=dict(color="#e0f7fa"), legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
-    st.plotly_chart(fig, use_container_width=True)
+    chart_type = st.radio("Select Chart Type", ["Line Chart", "Area Chart"], horizontal=True, key="chart_type")
+    st.plotly_chart(time_series_fig(chart_type, date.today()), width="stretch")
 
 
 # ---------- Tab 3: Export ----------
-with tab3:
+if active_tab == "Export Data":
     st.markdown("## 📥 Data Export")
     col1, col2 = st.columns(2)
 
 
     with col1:
         st.markdown("### Export Options")
-        export_format = st.selectbox("Select Export Format", ["CSV", "NetCDF", "JSON", "Excel"])
-        data_range = st.selectbox("Select Data Range", ["All Data", "Current View", "Custom Selection"])
+        export_format = st.selectbox("Select Export Format", ["CSV", "NetCDF", "JSON", "Excel"], key="export_format")
+        data_range = st.selectbox("Select Data Range", ["All Data", "Current View", "Custom Selection"], key="data_range")
 
 
         if data_range == "Custom Selection":
-            custom_dates = st.date_input("Select Custom Date Range", value=(datetime.now() - timedelta(days=30), datetime.now()), max_value=datetime.now())
+            custom_dates = st.date_input("Select Custom Date Range", max_value=datetime.now(), key="custom_dates")
 
 
-        include_metadata = st.checkbox("Include Metadata", value=True)
+        include_metadata = st.checkbox("Include Metadata", key="include_metadata")
 
 
         if st.button("Generate Export", key="generate_export"):
             with st.spinner("Preparing your data for export..."):
-                time.sleep(2)
+                if SIMULATE_DELAY:
+                    time.sleep(SIMULATE_DELAY)
+                st.session_state.sample_data = build_sample_df()
+                # encode once here; reruns serve these bytes instead of re-serializing
+                st.session_state.sample_csv = st.session_state.sample_data.to_csv(index=False).encode("utf-8")
             st.success("Your data is ready for download!")
 
 
     with col2:
         st.markdown("### Download")
-        st.info("Click the button below to download your data in the selected format.")
-
-
-        sample_data = pd.DataFrame({
-            "date": pd.date_range(end=pd.Timestamp.today(), periods=10, freq="D"),
-            "latitude": [random.uniform(-60, 60) for _ in range(10)],
-            "longitude": [random.uniform(-180, 180) for _ in range(10)],
-            "temperature": [random.uniform(0, 30) for _ in range(10)],
-            "salinity": [random.uniform(33, 37) for _ in range(10)],
-            "depth": [random.uniform(0, 2000) for _ in range(10)],
-        })
+        # sample data is only built once "Generate Export" is clicked, not on every rerun
+        sample_data = st.session_state.get("sample_data")
 
 
-        if export_format == "CSV":
-            csv = sample_data.to_csv(index=False)
-            st.download_button(label="Download CSV", data=csv, file_name="argo_data.csv", mime="text/csv")
+        if sample_data is None:
+            st.info("Click \"Generate Export\" to prepare your data for download.")
+        elif export_format == "CSV":
+            st.info("Click the button below to download your data in the selected format.")
+            st.download_button(label="Download CSV", data=st.session_state.sample_csv, file_name="argo_data.csv", mime="text/csv")
         elif export_format == "Excel":
             st.warning("Excel export requires additional setup. Please use CSV format for now.")
         else:
             st.warning(f"{export_format} export requires additional setup. Please use CSV format for now.")
 
 
-    st.markdown("### Data Preview")
-    st.dataframe(sample_data, use_container_width=True)
+    if sample_data is not None:
+        st.markdown("### Data Preview")
+        st.dataframe(sample_data, width="stretch")
 